@@ -3,9 +3,17 @@
 Freak-n-Fries Flask Application - Fixed settings access
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, g
 import sqlite3
 import os
+import queue
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import groupby
+from types import MappingProxyType
 
 app = Flask(__name__)
 app.secret_key = 'freaknfries_secret_key_2025'
@@ -24,254 +32,421 @@ else:
     app.config['DEBUG'] = True
     DATABASE = os.path.join('data', 'site.db')
 
+# Connections are opened once and reused rather than per helper call
+_POOL_SIZE = 8
+# Prepared statements are cached per connection, so pooling keeps them warm
+_CACHED_STATEMENTS = 128
+_pool = queue.LifoQueue(maxsize=_POOL_SIZE)
+_local = threading.local()
+
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
+    conn = sqlite3.connect(DATABASE, check_same_thread=False,
+                           cached_statements=_CACHED_STATEMENTS)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
     return conn
 
-def get_site_settings():
-    """Get site settings - fixed to handle different database structures"""
-    conn = get_db_connection()
-    
+@contextmanager
+def db_conn():
+    """Borrow a pooled connection, returning it to the pool afterwards.
+
+    Nested calls on the same thread share the outer connection, so a route
+    can wrap several helpers in one block and pay for a single checkout.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
     try:
-        # Method 1: Try the settings table with id=1 (your current structure)
-        try:
-            settings_row = conn.execute('SELECT * FROM settings WHERE id = 1').fetchone()
-            if settings_row:
-                # Convert Row object to dictionary and return individual values
-                site_settings = {
-                    'company_name': settings_row['company_name'] if 'company_name' in settings_row.keys() else 'Freak-n-Fries',
-                    'tagline': settings_row['tagline'] if 'tagline' in settings_row.keys() else 'Home of the Dutch frikandel in the US',
-                    'phone': settings_row['phone'] if 'phone' in settings_row.keys() else '440 453 1877',
-                    'email': settings_row['email'] if 'email' in settings_row.keys() else 'info@freaknfries.com',
-                    'product_name': settings_row['product_name'] if 'product_name' in settings_row.keys() else 'Dutch Dawg®'
-                }
-                conn.close()
-                return site_settings
-        except sqlite3.Error as e1:
-            print(f"Method 1 failed: {e1}")
-        
-        # Method 2: Try key-value pairs in settings table
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT key, value FROM settings")
-            settings_rows = cursor.fetchall()
-            if settings_rows:
-                site_settings = {}
-                for row in settings_rows:
-                    site_settings[row['key']] = row['value']
-                
-                # Ensure all required keys exist
-                defaults = {
-                    'company_name': 'Freak-n-Fries',
-                    'tagline': 'Home of the Dutch frikandel in the US',
-                    'phone': '440 453 1877',
-                    'email': 'info@freaknfries.com',
-                    'product_name': 'Dutch Dawg®'
-                }
-                
-                for key, default_value in defaults.items():
-                    if key not in site_settings:
-                        site_settings[key] = default_value
-                
-                conn.close()
-                return site_settings
-        except sqlite3.Error as e2:
-            print(f"Method 2 failed: {e2}")
-        
-        # Method 3: Fallback to default values
-        print("Using fallback default values")
-        site_settings = {
-            'company_name': 'Freak-n-Fries',
-            'tagline': 'Home of the Dutch frikandel in the US',
-            'phone': '440 453 1877',
-            'email': 'info@freaknfries.com',
-            'product_name': 'Dutch Dawg®'
-        }
-        
-    except Exception as e:
-        print(f"Database error in get_site_settings: {e}")
-        # Return default values if all else fails
-        site_settings = {
-            'company_name': 'Freak-n-Fries',
-            'tagline': 'Home of the Dutch frikandel in the US',
-            'phone': '440 453 1877',
-            'email': 'info@freaknfries.com',
-            'product_name': 'Dutch Dawg®'
-        }
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = get_db_connection()
+    _local.conn = conn
+    try:
+        yield conn
     finally:
-        if conn:
+        _local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
             conn.close()
+
+# Open one long-lived read-only handle at import so the first request does
+# not pay for the initial file open and WAL/shm mapping
+try:
+    _bootstrap = sqlite3.connect(f'file:{DATABASE}?mode=ro', uri=True, check_same_thread=False)
+    _bootstrap.execute('PRAGMA journal_mode').fetchone()
+except sqlite3.Error as e:
+    app.logger.warning("Could not warm database connection: %s", e)
+    _bootstrap = None
+
+# Used for any setting the database doesn't provide
+_DEFAULT_SETTINGS = MappingProxyType({
+    'company_name': 'Freak-n-Fries',
+    'tagline': 'Home of the Dutch frikandel in the US',
+    'phone': '440 453 1877',
+    'email': 'info@freaknfries.com',
+    'product_name': 'Dutch Dawg®'
+})
+
+# Settings change rarely, so keep them in-process for a short while
+_SETTINGS_TTL = 60  # seconds
+_SETTINGS_CACHE = {'val': None, 'exp': 0}
+
+def invalidate_settings_cache():
+    """Drop cached site settings - call after the settings are updated"""
+    _SETTINGS_CACHE['val'] = None
+
+def get_site_settings():
+    """Get site settings, memoized on flask.g and cached for _SETTINGS_TTL seconds"""
+    if 'site_settings' in g:
+        return g.site_settings
+    now = time.monotonic()
+    if _SETTINGS_CACHE['val'] and _SETTINGS_CACHE['exp'] > now:
+        g.site_settings = _SETTINGS_CACHE['val']
+        return g.site_settings
+    g.site_settings = _compute_site_settings()
+    _SETTINGS_CACHE.update(val=g.site_settings, exp=now + _SETTINGS_TTL)
+    return g.site_settings
+
+def _parse_settings_row(cursor):
+    """Method 1: a single settings row with id=1 (your current structure)"""
+    settings_row = cursor.fetchone()
+    if not settings_row:
+        return None
+    # Row columns override the defaults for any field the table provides
+    site_settings = dict(_DEFAULT_SETTINGS)
+    site_settings.update(dict(settings_row))
+    return site_settings
+
+def _parse_settings_pairs(cursor):
+    """Method 2: key-value pairs in the settings table"""
+    settings_rows = cursor.fetchall()
+    if not settings_rows:
+        return None
+    # Start from the defaults so all required keys exist
+    site_settings = dict(_DEFAULT_SETTINGS)
+    for row in settings_rows:
+        site_settings[row['key']] = row['value']
+    return site_settings
+
+def _settings_row_query(conn):
+    """Method 1 query, selecting only the known settings columns that exist.
+
+    Missing columns keep their defaults instead of failing the whole query.
+    """
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(settings)')}
+    wanted = [key for key in _DEFAULT_SETTINGS if key in columns]
+    if 'id' not in columns or not wanted:
+        return None
+    return f"SELECT {', '.join(wanted)} FROM settings WHERE id = 1 LIMIT 1"
+
+def _settings_pairs_query(conn):
+    return 'SELECT key, value FROM settings'
+
+_SETTINGS_METHODS = (
+    (_settings_row_query, _parse_settings_row),
+    (_settings_pairs_query, _parse_settings_pairs),
+)
+
+def _detect_settings_method():
+    """Pick the settings query that works with this database's structure.
+
+    The schema doesn't change at runtime, so this probe runs once at import.
+    """
+    if not os.path.exists(DATABASE):
+        # Don't let the probe create an empty database file
+        return None, None
+    try:
+        with db_conn() as conn:
+            for build_query, parser in _SETTINGS_METHODS:
+                query = build_query(conn)
+                if not query:
+                    continue
+                try:
+                    conn.execute(query)
+                    return query, parser
+                except sqlite3.Error as e:
+                    app.logger.debug("Settings query %r failed: %s", query, e)
+    except sqlite3.Error as e:
+        app.logger.error("Database error detecting settings structure: %s", e)
+    return None, None
+
+_SETTINGS_QUERY, _SETTINGS_PARSER = _detect_settings_method()
+
+def _compute_site_settings():
+    """Load site settings using the query detected at startup"""
+    global _SETTINGS_QUERY, _SETTINGS_PARSER
+    if _SETTINGS_QUERY is None:
+        # The database wasn't usable at import (missing file or tables), so
+        # keep probing until it is
+        _SETTINGS_QUERY, _SETTINGS_PARSER = _detect_settings_method()
+    
+    site_settings = None
+    if _SETTINGS_QUERY:
+        try:
+            with db_conn() as conn:
+                site_settings = _SETTINGS_PARSER(conn.execute(_SETTINGS_QUERY))
+        except sqlite3.Error as e:
+            app.logger.error("Database error in get_site_settings: %s", e)
+    
+    if site_settings is None:
+        # Fallback to default values
+        app.logger.warning("Using fallback default values")
+        site_settings = dict(_DEFAULT_SETTINGS)
     
     return site_settings
 
 def get_page(slug):
     """Get page data from pages table"""
-    conn = get_db_connection()
     try:
-        page = conn.execute('SELECT * FROM pages WHERE slug = ?', (slug,)).fetchone()
-        return page
+        with db_conn() as conn:
+            page = conn.execute('SELECT id, slug, title, meta_description FROM pages WHERE slug = ?', (slug,)).fetchone()
+        return dict(page) if page else None
     except sqlite3.Error as e:
-        print(f"Error getting page {slug}: {e}")
+        app.logger.error("Error getting page %s: %s", slug, e)
         return None
-    finally:
-        conn.close()
 
 def get_page_content(page_name):
     """Get page content from page_content table"""
-    conn = get_db_connection()
     try:
-        content = conn.execute('SELECT * FROM page_content WHERE page_name = ?', (page_name,)).fetchone()
-        return content
+        with db_conn() as conn:
+            content = conn.execute('SELECT id, page_name, title, description FROM page_content WHERE page_name = ?', (page_name,)).fetchone()
+        return dict(content) if content else None
     except sqlite3.Error as e:
-        print(f"Error getting page content {page_name}: {e}")
+        app.logger.error("Error getting page content %s: %s", page_name, e)
         return None
-    finally:
-        conn.close()
 
-def get_retailers_by_category(category):
-    """Get retailers by category"""
-    conn = get_db_connection()
+def get_retailers_grouped(categories):
+    """Get retailers for several categories in one query, keyed by category"""
+    grouped = {category: [] for category in categories}
+    placeholders = ', '.join('?' * len(categories))
     try:
-        retailers = conn.execute('SELECT * FROM retailers WHERE category = ? ORDER BY name', (category,)).fetchall()
-        return retailers
+        with db_conn() as conn:
+            retailers = conn.execute(
+                'SELECT name, category FROM retailers '
+                f'WHERE category IN ({placeholders}) ORDER BY category, name',
+                tuple(categories)).fetchall()
     except sqlite3.Error as e:
-        print(f"Error getting retailers for category {category}: {e}")
-        return []
-    finally:
-        conn.close()
+        app.logger.error("Error getting retailers for categories %s: %s", categories, e)
+        return grouped
+    for category, rows in groupby(retailers, key=lambda r: r['category']):
+        grouped[category] = [dict(r) for r in rows]
+    return grouped
+
+def get_retailers_by_category(category):
+    """Get retailers by category"""
+    return get_retailers_grouped((category,))[category]
 
 def get_all_retailers():
     """Get all retailers"""
-    conn = get_db_connection()
     try:
-        retailers = conn.execute('SELECT * FROM retailers ORDER BY category, name').fetchall()
-        return retailers
+        with db_conn() as conn:
+            retailers = conn.execute('SELECT name, category FROM retailers ORDER BY category, name').fetchall()
+        return [dict(r) for r in retailers]
     except sqlite3.Error as e:
-        print(f"Error getting all retailers: {e}")
+        app.logger.error("Error getting all retailers: %s", e)
         return []
-    finally:
-        conn.close()
 
 def get_testimonials():
     """Get active testimonials"""
-    conn = get_db_connection()
     try:
-        testimonials = conn.execute('SELECT * FROM testimonials WHERE active = 1').fetchall()
-        return testimonials
+        with db_conn() as conn:
+            testimonials = conn.execute('SELECT quote, author, source FROM testimonials WHERE active = 1').fetchall()
+        return [dict(t) for t in testimonials]
     except sqlite3.Error as e:
-        print(f"Error getting testimonials: {e}")
+        app.logger.error("Error getting testimonials: %s", e)
         return []
-    finally:
-        conn.close()
+
+def get_first_testimonial():
+    """Get the first active testimonial"""
+    try:
+        with db_conn() as conn:
+            testimonial = conn.execute('SELECT quote, author, source FROM testimonials WHERE active = 1 ORDER BY id LIMIT 1').fetchone()
+        return dict(testimonial) if testimonial else None
+    except sqlite3.Error as e:
+        app.logger.error("Error getting first testimonial: %s", e)
+        return None
+
+def init_db():
+    """Create the tables if they don't exist yet and add the indexes the
+    page queries rely on"""
+    os.makedirs(os.path.dirname(DATABASE) or '.', exist_ok=True)
+    with db_conn() as conn:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                slug TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL,
+                content TEXT,
+                meta_description TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS retailers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                location TEXT,
+                url TEXT,
+                facebook_url TEXT,
+                category TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                id INTEGER PRIMARY KEY,
+                company_name TEXT NOT NULL,
+                tagline TEXT,
+                phone TEXT,
+                email TEXT,
+                product_name TEXT,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS page_content (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_name TEXT UNIQUE NOT NULL,
+                title TEXT,
+                description TEXT,
+                features TEXT,
+                content TEXT,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS testimonials (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                quote TEXT NOT NULL,
+                author TEXT NOT NULL,
+                source TEXT,
+                active INTEGER DEFAULT 1,
+                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            
+            CREATE INDEX IF NOT EXISTS idx_retailers_cat_name
+                ON retailers(category, name);
+            CREATE INDEX IF NOT EXISTS idx_testimonials_active
+                ON testimonials(active) WHERE active = 1;
+        ''')
+
+@lru_cache(maxsize=512)
+def _format_date(date, fmt):
+    # Few distinct dates appear on the site, so remember their formatted form
+    return date.strftime(fmt)
 
 @app.template_filter('strftime')
 def strftime_filter(date, fmt='%Y-%m-%d'):
     if date:
+        # Aware datetimes in different zones compare (and hash) equal, so
+        # only naive ones can share a cached string
+        if getattr(date, 'tzinfo', None) is None:
+            try:
+                return _format_date(date, fmt)
+            except TypeError:
+                pass  # unhashable input
         return date.strftime(fmt)
     return ''
 
-@app.context_processor
-def inject_global_vars():
-    """Make site_settings and settings available to all templates"""
-    site_settings = get_site_settings()
-    return {
-        'site_settings': site_settings,
-        'settings': site_settings  # For base.html which uses 'settings'
-    }
+class LazySettings(Mapping):
+    """Read-only view of the site settings that loads them on first access"""
+
+    def __getitem__(self, key):
+        return get_site_settings()[key]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return get_site_settings()[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self):
+        return iter(get_site_settings())
+
+    def __len__(self):
+        return len(get_site_settings())
+
+# Templates read settings through a lazy global instead of a context
+# processor, so settings are only fetched when a template references them
+_lazy_settings = LazySettings()
+app.jinja_env.globals['site_settings'] = _lazy_settings
+app.jinja_env.globals['settings'] = _lazy_settings  # For base.html which uses 'settings'
 
 @app.route('/')
 def index():
     """Home page"""
     try:
-        site_settings = get_site_settings()
-        home_content = get_page_content('home')
-        testimonials = get_testimonials()
-        testimonial = testimonials[0] if testimonials else None
+        # The templates read settings and the testimonial but no page or
+        # page_content rows, so only those are fetched
+        with db_conn():
+            get_site_settings()
+            testimonial = get_first_testimonial()
         
         return render_template('index.html',
-                             site_settings=site_settings,
-                             settings=site_settings,
-                             home_content=home_content,
                              testimonial=testimonial)
     except Exception as e:
-        print(f"Error in index route: {e}")
+        app.logger.error("Error in index route: %s", e)
         return f"Error loading home page: {e}", 500
 
-@app.route('/about')
+@app.route('/about/')
 def about():
     """About page"""
     try:
         site_settings = get_site_settings()
-        page = get_page('about')
-        about_content = get_page_content('about')
         
-        print(f"About route - site_settings type: {type(site_settings)}")
-        print(f"About route - site_settings: {site_settings}")
+        app.logger.debug("About route - site_settings: %s", site_settings)
         
-        return render_template('about.html',
-                             site_settings=site_settings,
-                             settings=site_settings,
-                             page=page,
-                             about_content=about_content)
+        return render_template('about.html')
     except Exception as e:
-        print(f"Error in about route: {e}")
+        app.logger.error("Error in about route: %s", e)
         return f"Error loading about page: {e}", 500
 
-@app.route('/where-to-buy')
+@app.route('/where-to-buy/')
 def where_to_buy():
     """Where to Buy page"""
     try:
-        site_settings = get_site_settings()
-        page = get_page('where-to-buy')
-        where_content = get_page_content('where-to-buy')
-        
-        # Get retailers by category
-        online_retailers = get_retailers_by_category('online')
-        restaurants = get_retailers_by_category('restaurant')
+        with db_conn():
+            site_settings = get_site_settings()
+            
+            # Get retailers by category
+            retailers = get_retailers_grouped(('online', 'restaurant'))
+            online_retailers = retailers['online']
+            restaurants = retailers['restaurant']
         
-        print(f"Where-to-buy route - site_settings type: {type(site_settings)}")
-        print(f"Where-to-buy route - site_settings: {site_settings}")
+        app.logger.debug("Where-to-buy route - site_settings: %s", site_settings)
         
         return render_template('where-to-buy.html',
-                             site_settings=site_settings,
-                             settings=site_settings,
-                             page=page,
-                             where_content=where_content,
                              online_retailers=online_retailers,
                              restaurants=restaurants,
                              retailer=online_retailers,  # For template loops
                              restaurant=restaurants)     # For template loops
     except Exception as e:
-        print(f"Error in where_to_buy route: {e}")
+        app.logger.error("Error in where_to_buy route: %s", e)
         return f"Error loading where to buy page: {e}", 500
 
 @app.route('/admin')
 def admin():
     """Admin page"""
     try:
-        site_settings = get_site_settings()
-        retailers = get_all_retailers()
-        testimonials = get_testimonials()
-        
-        # Get pages for admin interface
-        conn = get_db_connection()
-        try:
-            pages = conn.execute('SELECT * FROM pages ORDER BY slug').fetchall()
-        except sqlite3.Error as e:
-            print(f"Error getting pages: {e}")
-            pages = []
-        finally:
-            conn.close()
+        # Read everything inside one transaction so SQLite takes a single
+        # read lock and snapshot for the whole admin view
+        with db_conn() as conn:
+            conn.execute('BEGIN')
+            retailers = get_all_retailers()
+            
+            # Get pages for admin interface
+            try:
+                pages = [dict(p) for p in conn.execute('SELECT slug FROM pages ORDER BY slug').fetchall()]
+            except sqlite3.Error as e:
+                app.logger.error("Error getting pages: %s", e)
+                pages = []
         
         return render_template('admin.html',
-                             site_settings=site_settings,
-                             settings=site_settings,
                              retailers=retailers,
-                             testimonials=testimonials,
                              pages=pages)
     except Exception as e:
-        print(f"Error in admin route: {e}")
+        app.logger.error("Error in admin route: %s", e)
         return f"Error loading admin page: {e}", 500
 
 @app.errorhandler(404)
@@ -284,17 +459,45 @@ def internal_error(error):
     site_settings = get_site_settings()
     return f"Internal server error - {site_settings['company_name']}", 500
 
+LOCAL_IP_CACHE = os.path.join('data', '.local_ip')
+LOCAL_IP_TTL = 3600  # seconds
+
 def get_local_ip():
     """Get the local IP address for network access"""
     import socket
+    # The hostname usually resolves to the LAN address without any network I/O
+    try:
+        local_ip = socket.gethostbyname(socket.gethostname())
+        if not local_ip.startswith('127.'):
+            return local_ip
+    except OSError:
+        pass
+    
+    # Reuse the address found by a recent probe
+    try:
+        if time.time() - os.path.getmtime(LOCAL_IP_CACHE) < LOCAL_IP_TTL:
+            with open(LOCAL_IP_CACHE) as f:
+                local_ip = f.read().strip()
+            if local_ip:
+                return local_ip
+    except OSError:
+        pass
+    
     try:
         # Connect to a remote server to get local IP
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.settimeout(1)
             s.connect(("8.8.8.8", 80))
             local_ip = s.getsockname()[0]
-        return local_ip
     except Exception:
         return "localhost"
+    
+    try:
+        with open(LOCAL_IP_CACHE, 'w') as f:
+            f.write(local_ip)
+    except OSError:
+        pass
+    return local_ip
 
 if __name__ == '__main__':
     # Only run the development server when running directly
@@ -4,10 +4,17 @@ Static site generator for Freak 'n Fries website
 Converts Flask app to static HTML files for GitHub Pages deployment
 """
 
+import gzip
+import hashlib
+import multiprocessing
 import os
+import re
 import shutil
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin
-from flask_frozen import Freezer
+from flask import url_for
+from flask_frozen import Freezer, MissingURLGeneratorWarning
 from app import app
 
 # Configure Freezer
@@ -15,7 +22,11 @@ app.config['FREEZER_DESTINATION'] = 'build'
 app.config['FREEZER_RELATIVE_URLS'] = True
 app.config['FREEZER_DESTINATION_IGNORE'] = ['.git*', 'CNAME', '.nojekyll']
 
-freezer = Freezer(app)
+# Only the public pages listed in all_pages() are frozen; the admin page
+# needs the live app
+freezer = Freezer(app, with_no_argument_rules=False)
+warnings.filterwarnings('ignore', message='Nothing frozen for endpoints admin',
+                        category=MissingURLGeneratorWarning)
 
 @freezer.register_generator
 def static_files():
@@ -26,19 +37,72 @@ def static_files():
     for filename in os.listdir(os.path.join(app.static_folder, 'js')):
         yield 'static', {'filename': f'js/{filename}'}
     
-    # Add image files if they exist
+    # Add image files (including subfolders) if they exist
     images_dir = os.path.join(app.static_folder, 'images')
     if os.path.exists(images_dir):
-        for filename in os.listdir(images_dir):
-            yield 'static', {'filename': f'images/{filename}'}
+        for root, _dirs, files in os.walk(images_dir):
+            for filename in files:
+                rel_path = os.path.relpath(os.path.join(root, filename), app.static_folder)
+                yield 'static', {'filename': rel_path.replace(os.sep, '/')}
 
 @freezer.register_generator
 def all_pages():
     """Generate URLs for all pages"""
-    # Main pages
-    yield 'home'
-    yield 'about'
-    yield 'where_to_buy'
+    # Main pages (endpoint, values) - a bare string would be taken as a URL
+    yield 'index', {}
+    yield 'about', {}
+    yield 'where_to_buy', {}
+
+def _freeze_urls(urls):
+    """Render one slice of URLs into the build directory (runs in a worker)"""
+    # Other workers write to the same destination, so keep their files
+    app.config['FREEZER_REMOVE_EXTRA_FILES'] = False
+    worker = Freezer(app, with_static_files=False, with_no_argument_rules=False,
+                     log_url_for=False)
+    
+    @worker.register_generator
+    def url_slice():
+        return urls
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', MissingURLGeneratorWarning)
+        with app.app_context():
+            return len(worker.freeze())
+
+# Spawning a worker re-imports the app, which costs far more than rendering
+# a page of this site, so only fan out for large page counts
+PARALLEL_MIN_PAGES = 50
+
+def freeze_parallel(workers=1):
+    """Freeze the site, optionally rendering pages across worker processes.
+
+    The serial freeze is the default. With more than one worker and at least
+    PARALLEL_MIN_PAGES pages, static files are still copied here and only the
+    all_pages() URLs are dealt to workers. Workers don't follow url_for links,
+    so in that mode every page must be listed in all_pages().
+    """
+    with app.test_request_context():
+        page_urls = sorted({url_for(endpoint, **values) for endpoint, values in all_pages()})
+    
+    if workers <= 1 or len(page_urls) < PARALLEL_MIN_PAGES:
+        with app.app_context():
+            return len(freezer.freeze())
+    
+    # Workers write to the same destination, so nobody removes "extra" files
+    app.config['FREEZER_REMOVE_EXTRA_FILES'] = False
+    static_freezer = Freezer(app, with_no_argument_rules=False, log_url_for=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', MissingURLGeneratorWarning)
+        with app.app_context():
+            frozen = len(static_freezer.freeze())
+    
+    # Round-robin so the heavier page renders don't all land on one worker.
+    # Workers are spawned rather than forked so none of them inherits this
+    # process's open SQLite connections.
+    slices = [page_urls[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        return frozen + sum(pool.map(_freeze_urls, [s for s in slices if s]))
 
 def prepare_build_directory():
     """Prepare the build directory for deployment"""
@@ -75,29 +139,95 @@ Sitemap: https://www.freaknfries.com/sitemap.xml
         <priority>1.0</priority>
     </url>
     <url>
-        <loc>https://www.freaknfries.com/about</loc>
+        <loc>https://www.freaknfries.com/about/</loc>
         <changefreq>monthly</changefreq>
         <priority>0.8</priority>
     </url>
     <url>
-        <loc>https://www.freaknfries.com/where-to-buy</loc>
+        <loc>https://www.freaknfries.com/where-to-buy/</loc>
         <changefreq>weekly</changefreq>
         <priority>0.9</priority>
     </url>
 </urlset>
 """)
 
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.xml', '.json', '.txt')
+
+def fingerprint_static_files(build_dir):
+    """Copy CSS/JS to content-hashed names and point the HTML at them"""
+    static_dir = os.path.join(build_dir, 'static')
+    renamed = {}
+    
+    for root, _dirs, files in os.walk(static_dir):
+        for filename in files:
+            if not filename.endswith(FINGERPRINT_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+            stem, ext = os.path.splitext(filename)
+            hashed_name = f'{stem}.{digest}{ext}'
+            # Keep the original too so anything not rewritten still resolves
+            shutil.copyfile(path, os.path.join(root, hashed_name))
+            rel_path = os.path.relpath(path, build_dir).replace(os.sep, '/')
+            renamed[rel_path] = rel_path[:-len(filename)] + hashed_name
+    
+    if not renamed:
+        return
+    
+    pattern = re.compile(
+        r'(?<=[/"\'])(' + '|'.join(re.escape(p) for p in renamed) + r')(?=["\'?#])'
+    )
+    for root, _dirs, files in os.walk(build_dir):
+        for filename in files:
+            if not filename.endswith('.html'):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+            rewritten = pattern.sub(lambda m: renamed[m.group(1)], html)
+            if rewritten != html:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(rewritten)
+    
+    print(f"  Fingerprinted {len(renamed)} assets")
+
+def compress_static_files(build_dir):
+    """Write precompressed .gz (and .br, if brotli is installed) siblings"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("  brotli not installed - skipping .br files")
+    
+    count = 0
+    for root, _dirs, files in os.walk(build_dir):
+        for filename in files:
+            if not filename.endswith(COMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, 9))
+            if brotli:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+            count += 1
+    
+    print(f"  Compressed {count} files")
+
 def optimize_static_files():
     """Optimize static files for production"""
     build_dir = app.config['FREEZER_DESTINATION']
     
     print("Optimizing static files...")
     
-    # Here you could add:
-    # - CSS minification
-    # - JavaScript minification
-    # - Image optimization
-    # - GZIP compression
+    # Cache-busting names first, so the compressed HTML has the final links.
+    # Serve the precompressed files with e.g. nginx's gzip_static/brotli_static.
+    fingerprint_static_files(build_dir)
+    compress_static_files(build_dir)
     
     print("Static file optimization complete.")
 
@@ -146,7 +276,7 @@ def generate_deployment_info():
         'generated_at': __import__('datetime').datetime.now().isoformat(),
         'python_version': __import__('sys').version,
         'flask_version': __import__('flask').__version__,
-        'pages_generated': ['/', '/about', '/where-to-buy'],
+        'pages_generated': ['/', '/about/', '/where-to-buy/'],
         'deployment_target': 'GitHub Pages',
         'instructions': [
             '1. Commit all files in the build/ directory to your repository',
@@ -165,7 +295,7 @@ def main():
     """Main function to generate static site"""
     print("🚀 Starting static site generation for Freak 'n Fries...")
     
-    # Initialize database if it doesn't exist
+    # Create any missing tables and the indexes the pages rely on
     from app import init_db
     init_db()
     
@@ -173,9 +303,10 @@ def main():
     clean_build_directory()
     
     # Generate static files
+    # Site settings are cached per process, so each worker loads them once
     print("📄 Generating static HTML files...")
-    with app.app_context():
-        freezer.freeze()
+    # Set FREEZE_WORKERS to render a large site across several processes
+    freeze_parallel(int(os.environ.get('FREEZE_WORKERS', 1)))
     
     # Post-processing
     prepare_build_directory()
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for Freak-n-Fries
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+
+Threaded workers suit the blocking sqlite3 calls; with the database in WAL
+mode the readers in every worker and thread run in parallel.
+"""
+
+import os
+import sqlite3
+
+bind = '0.0.0.0:8000'
+workers = 4
+worker_class = 'gthread'
+threads = 8
+
+DATABASE = os.path.join('data', 'site.db')
+
+def on_starting(server):
+    """Switch the database to WAL once, before any worker starts.
+
+    This deliberately doesn't import app: its SQLite connections would be
+    inherited by the forked workers, and connections must not cross a fork.
+    """
+    if not os.path.exists(DATABASE):
+        return
+    conn = sqlite3.connect(DATABASE)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+    finally:
+        conn.close()
@@ -10,6 +10,15 @@ Instructions:
 1. Replace 'yourusername' with your actual PythonAnywhere username
 2. Upload this file to your project root directory
 3. Configure PythonAnywhere to use this file as your WSGI configuration
+
+The public pages can be served without Python at all: run `python freeze.py`
+and deploy the build/ directory. This WSGI entry point is only needed for
+the live app (e.g. the admin page).
+
+This file points the app at the PythonAnywhere paths. Elsewhere, serve the
+app module directly with gunicorn using the bundled config:
+
+    gunicorn -c gunicorn.conf.py app:app
 """
 
 import sys